@@ -6,6 +6,9 @@ from aiogram.fsm.storage.memory import MemoryStorage
 from app.config import settings
 from app.database import init_db
 from app.handlers import user, admin, payment, support
+from app.services.openrouter import openrouter_service
+from app.services.notification_queue import notification_queue
+from app.services.notification_service import NotificationService
 
 # Setup logging
 logging.basicConfig(
@@ -15,6 +18,17 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+def install_uvloop():
+    """Use uvloop event loop if available (faster asyncio I/O, not supported on Windows)"""
+    try:
+        import uvloop
+    except ImportError:
+        logger.info("uvloop not installed, using default asyncio event loop")
+        return
+
+    uvloop.install()
+
+
 async def main():
     """Main bot function"""
     # Initialize database
@@ -46,10 +60,14 @@ async def main():
         # Start polling
         await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
     finally:
+        await notification_queue.drain()
+        await NotificationService.flush_admin_payments()
+        await openrouter_service.close()
         await bot.session.close()
 
 
 if __name__ == "__main__":
+    install_uvloop()
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
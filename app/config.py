@@ -1,5 +1,7 @@
+from functools import cached_property
+from pydantic import Field
 from pydantic_settings import BaseSettings
-from typing import List, Optional
+from typing import Optional, Tuple
 
 
 class Settings(BaseSettings):
@@ -20,6 +22,8 @@ class Settings(BaseSettings):
     # Use Gemini 2.5 Flash Image for image editing/generation
     # This model supports both image input and image output with modalities
     OPENROUTER_MODEL: str = "google/gemini-2.5-flash-image-preview"
+    # zlib level (0-9) for PNG results after chroma keying: 1 is fastest, 9 is smallest
+    RESULT_PNG_COMPRESS_LEVEL: int = Field(1, ge=0, le=9)
 
     # YooKassa (ЮКасса)
     YOOKASSA_SHOP_ID: str
@@ -53,10 +57,10 @@ class Settings(BaseSettings):
         # Otherwise, construct from individual components
         return f"postgresql+asyncpg://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
 
-    @property
-    def admin_ids_list(self) -> List[int]:
-        """Get list of admin telegram IDs"""
-        return [int(id.strip()) for id in self.ADMIN_IDS.split(",") if id.strip()]
+    @cached_property
+    def admin_ids_list(self) -> Tuple[int, ...]:
+        """Get admin telegram IDs (parsed once from ADMIN_IDS)"""
+        return tuple(int(id.strip()) for id in self.ADMIN_IDS.split(",") if id.strip())
 
 
 # Global settings instance
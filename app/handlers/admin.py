@@ -11,6 +11,7 @@ from app.database.crud import (
     add_support_message
 )
 from app.services.notification_service import NotificationService
+from app.services.notification_queue import notification_queue
 from app.keyboards.admin_kb import (
     get_admin_menu, get_ticket_actions, get_admin_back, get_admin_cancel
 )
@@ -217,7 +218,8 @@ async def process_ticket_reply(message: Message, state: FSMContext):
         await resolve_ticket(session, ticket_id, message.from_user.id, message.text)
 
         # Send notification to user using NotificationService
-        await NotificationService.notify_user_support_reply(
+        notification_queue.enqueue(
+            NotificationService.notify_user_support_reply,
             bot=message.bot,
             telegram_id=ticket.user.telegram_id,
             ticket_id=ticket_id,
@@ -278,7 +280,8 @@ async def support_reply_command(message: Message):
         await resolve_ticket(session, ticket_id, message.from_user.id, reply_message)
 
         # Send notification to user
-        await NotificationService.notify_user_support_reply(
+        notification_queue.enqueue(
+            NotificationService.notify_user_support_reply,
             bot=message.bot,
             telegram_id=ticket.user.telegram_id,
             ticket_id=ticket_id,
@@ -235,6 +235,7 @@ async def notify_payment_success(bot, order_id: int):
     from sqlalchemy import select
     from sqlalchemy.orm import selectinload
     from app.services.notification_service import NotificationService
+    from app.services.notification_queue import notification_queue
     from app.database.crud import get_user_balance
 
     db = get_db()
@@ -253,8 +254,9 @@ async def notify_payment_success(bot, order_id: int):
         # Get user's new balance
         new_balance = await get_user_balance(session, order.user.telegram_id)
 
-        # Notify user
-        await NotificationService.notify_user_payment_success(
+        # Notify user (sent in background)
+        notification_queue.enqueue(
+            NotificationService.notify_user_payment_success,
             bot=bot,
             telegram_id=order.user.telegram_id,
             package_name=order.package.name,
@@ -264,7 +266,8 @@ async def notify_payment_success(bot, order_id: int):
         )
 
         # Notify admins
-        await NotificationService.notify_admins_new_payment(
+        notification_queue.enqueue(
+            NotificationService.notify_admins_new_payment,
             bot=bot,
             user_telegram_id=order.user.telegram_id,
             username=order.user.username,
@@ -8,6 +8,7 @@ from app.database.crud import create_support_ticket
 from app.keyboards.user_kb import get_support_menu, get_cancel_keyboard, get_back_keyboard
 from app.config import settings
 from app.services.notification_service import NotificationService
+from app.services.notification_queue import notification_queue
 
 router = Router()
 
@@ -113,8 +114,9 @@ async def process_support_message(message: Message, state: FSMContext):
             message=message.text
         )
 
-        # Notify admins using NotificationService
-        await NotificationService.notify_admins_new_support_request(
+        # Notify admins using NotificationService (sent in background)
+        notification_queue.enqueue(
+            NotificationService.notify_admins_new_support_request,
             bot=message.bot,
             ticket_id=ticket.id,
             user_telegram_id=message.from_user.id,
@@ -16,7 +16,7 @@ from app.keyboards.user_kb import (
 )
 from app.services.image_processor import ImageProcessor
 from app.services.prompt_builder import PromptBuilder
-from app.services.openrouter import OpenRouterService
+from app.services.openrouter import openrouter_service
 from app.config import settings
 from app.utils.decorators import error_handler
 
@@ -401,9 +401,8 @@ async def process_image_handler(message: Message):
 
             # Process image with OpenRouter
             # IMPORTANT: Balance is already reserved at this point
-            openrouter = OpenRouterService()
             # For white background, we don't apply chromakey removal (background_color=None)
-            result = await openrouter.remove_background(image_bytes, prompt, background_color=None)
+            result = await openrouter_service.remove_background(image_bytes, prompt, background_color=None)
 
             if result['success']:
                 # Send result
@@ -563,9 +562,8 @@ async def process_document_handler(message: Message):
 
             # Process image with OpenRouter (AI generates colored bg, then chroma key removes it)
             # IMPORTANT: Balance is already reserved at this point
-            openrouter = OpenRouterService()
             # Pass chromakey color for automatic removal
-            result = await openrouter.remove_background(image_bytes, prompt, background_color=chromakey_color)
+            result = await openrouter_service.remove_background(image_bytes, prompt, background_color=chromakey_color)
 
             if result['success']:
                 # Send result as document (lossless)
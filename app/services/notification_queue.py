@@ -0,0 +1,88 @@
+"""
+Background queue for sending notifications off the request-handling path
+"""
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class NotificationJob:
+    """Single queued notification: a NotificationService.notify_* coroutine function and its kwargs"""
+    handler: Callable[..., Awaitable[Any]]
+    kwargs: Dict[str, Any] = field(default_factory=dict)
+
+    async def run(self):
+        await self.handler(**self.kwargs)
+
+
+class NotificationQueue:
+    """
+    In-process asyncio.Queue drained by a small pool of worker tasks.
+
+    Workers are started lazily on first enqueue, so callers only need a running event loop.
+    """
+    def __init__(self, workers: int = 4, maxsize: int = 10_000):
+        self._workers_count = workers
+        self._maxsize = maxsize
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+
+    def _ensure_started(self):
+        """Create queue and worker tasks inside the running event loop"""
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self._maxsize)
+
+        if not self._workers:
+            self._workers = [
+                asyncio.create_task(self._worker(), name=f"notification-worker-{i}")
+                for i in range(self._workers_count)
+            ]
+
+    async def _worker(self):
+        """Process queued notifications forever"""
+        while True:
+            job = await self._queue.get()
+            try:
+                await job.run()
+            except Exception:
+                logger.exception(f"Notification job {job.handler.__name__} failed")
+            finally:
+                self._queue.task_done()
+
+    def enqueue(self, handler: Callable[..., Awaitable[Any]], **kwargs) -> bool:
+        """
+        Queue a notification without waiting for it to be sent
+
+        Args:
+            handler: NotificationService.notify_* method
+            **kwargs: Arguments for the handler (including bot)
+
+        Returns:
+            True if queued, False if the queue is full
+        """
+        self._ensure_started()
+
+        try:
+            self._queue.put_nowait(NotificationJob(handler, kwargs))
+            return True
+        except asyncio.QueueFull:
+            logger.error(f"Notification queue is full, dropping {handler.__name__}")
+            return False
+
+    async def drain(self):
+        """Wait until all queued notifications are sent, then stop workers"""
+        if self._queue is not None:
+            await self._queue.join()
+
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+
+# Global instance
+notification_queue = NotificationQueue()
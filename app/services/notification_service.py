@@ -1,14 +1,132 @@
 """
 Notification service for sending payment notifications to users and admins
 """
+import asyncio
+import html
 import logging
-from typing import Optional
+from typing import Dict, List, Optional
 from aiogram import Bot
 
 from app.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Static message templates (only the placeholders change between sends)
+_PAYMENT_SUCCESS_TEMPLATE = (
+    "✅ <b>Оплата прошла успешно!</b>\n\n"
+    "📦 Пакет: {package_name}\n"
+    "💎 Изображений: {images_count}\n"
+    "💰 Сумма: {amount:.2f}₽\n\n"
+    "📊 <b>Ваш новый баланс:</b>\n"
+    "🎁 Бесплатных: {free}\n"
+    "💎 Оплаченных: {paid}\n"
+    "━━━━━━━━━━━━━━━━━━\n"
+    "📸 Всего доступно: {total}\n\n"
+    "Спасибо за покупку! Можете приступать к обработке изображений."
+)
+
+_ADMIN_PAYMENT_TEMPLATE = (
+    "💰 <b>Новая покупка!</b>\n\n"
+    "👤 Пользователь: @{username} ({user_telegram_id})\n"
+    "📦 Пакет: {package_name}\n"
+    "💎 Изображений: {images_count}\n"
+    "💰 Сумма: {amount:.2f}₽\n"
+    "📝 Заказ: #{order_id}"
+)
+
+_ADMIN_PAYMENT_DIGEST_HEADER_TEMPLATE = "💰 <b>Новые покупки ({count}):</b>\n\n"
+_ADMIN_PAYMENT_DIGEST_LINE_TEMPLATE = (
+    "📝 #{order_id} · @{username} ({user_telegram_id}) · "
+    "{package_name} · {images_count} шт. · {amount:.2f}₽"
+)
+
+_PAYMENT_FAILED_HEADER_TEMPLATE = (
+    "❌ <b>Оплата не прошла</b>\n\n"
+    "📦 Пакет: {package_name}\n\n"
+)
+_PAYMENT_FAILED_REASON_TEMPLATE = "Причина: {error_message}\n\n"
+_PAYMENT_FAILED_FOOTER = (
+    "Попробуйте еще раз или обратитесь в поддержку, "
+    "если проблема повторяется."
+)
+
+_REFUND_TEMPLATE = (
+    "💵 <b>Возврат оформлен</b>\n\n"
+    "💰 Сумма возврата: {amount:.2f}₽\n"
+    "📸 Использовано изображений: {images_used}/{images_total}\n\n"
+    "Средства будут возвращены на вашу карту в течение 3-5 рабочих дней."
+)
+
+# Caps how many admin sends are in flight at once. This is a concurrency limit, not a
+# per-second rate limit: with fast round trips it does not by itself keep the bot under
+# Telegram's ~30 msg/s limit (fine for the small admin list)
+_admin_send_semaphore = asyncio.Semaphore(25)
+
+# Admin payment notifications arriving within this window are sent as one digest
+ADMIN_BATCH_SECONDS = 3
+# Digest is flushed early at this size to stay under Telegram's 4096-char message limit
+ADMIN_BATCH_MAX_ORDERS = 30
+
+_pending_admin_payments: List[Dict] = []
+_admin_flush_task: Optional[asyncio.Task] = None
+
+
+async def _send_to_admins(bot: Bot, text: str):
+    """
+    Send the same message to all admins in parallel
+
+    Args:
+        bot: Bot instance
+        text: Pre-formatted HTML message text
+    """
+    async def _send(admin_id: int):
+        async with _admin_send_semaphore:
+            try:
+                await bot.send_message(admin_id, text, parse_mode="HTML")
+            except Exception as e:
+                logger.error(f"Failed to notify admin {admin_id}: {str(e)}")
+
+    await asyncio.gather(*(_send(admin_id) for admin_id in settings.admin_ids_list))
+
+
+async def _flush_admin_payments(bot: Bot):
+    """
+    Send all pending admin payment notifications as a single message
+
+    Args:
+        bot: Bot instance
+    """
+    if not _pending_admin_payments:
+        return
+
+    orders = _pending_admin_payments.copy()
+    _pending_admin_payments.clear()
+
+    if len(orders) == 1:
+        text = _ADMIN_PAYMENT_TEMPLATE.format_map(orders[0])
+    else:
+        text = _ADMIN_PAYMENT_DIGEST_HEADER_TEMPLATE.format(count=len(orders)) + "\n".join(
+            _ADMIN_PAYMENT_DIGEST_LINE_TEMPLATE.format_map(order) for order in orders
+        )
+
+    await _send_to_admins(bot, text)
+    logger.info(f"Payment notification sent to admins for {len(orders)} order(s)")
+
+
+async def _flush_admin_payments_later(bot: Bot):
+    """Flush pending admin payment notifications after the batch window"""
+    global _admin_flush_task
+
+    await asyncio.sleep(ADMIN_BATCH_SECONDS)
+    try:
+        await _flush_admin_payments(bot)
+    finally:
+        # Cleared only after the send, so shutdown can still wait for it
+        _admin_flush_task = None
+        # Payments that arrived while the digest was being sent get their own batch
+        if _pending_admin_payments:
+            _admin_flush_task = asyncio.create_task(_flush_admin_payments_later(bot))
+
 
 class NotificationService:
     """Service for sending notifications via Telegram"""
@@ -34,18 +152,14 @@ class NotificationService:
             new_balance: User's new balance dict with keys: free, paid, total
         """
         try:
-            text = (
-                "✅ <b>Оплата прошла успешно!</b>\n\n"
-                f"📦 Пакет: {package_name}\n"
-                f"💎 Изображений: {images_count}\n"
-                f"💰 Сумма: {amount:.2f}₽\n\n"
-                "📊 <b>Ваш новый баланс:</b>\n"
-                f"🎁 Бесплатных: {new_balance['free']}\n"
-                f"💎 Оплаченных: {new_balance['paid']}\n"
-                f"━━━━━━━━━━━━━━━━━━\n"
-                f"📸 Всего доступно: {new_balance['total']}\n\n"
-                "Спасибо за покупку! Можете приступать к обработке изображений."
-            )
+            text = _PAYMENT_SUCCESS_TEMPLATE.format_map({
+                "package_name": html.escape(package_name),
+                "images_count": images_count,
+                "amount": amount,
+                "free": new_balance['free'],
+                "paid": new_balance['paid'],
+                "total": new_balance['total']
+            })
 
             await bot.send_message(telegram_id, text, parse_mode="HTML")
             logger.info(f"Payment success notification sent to user {telegram_id}")
@@ -66,6 +180,8 @@ class NotificationService:
         """
         Notify admins about new payment
 
+        Payments arriving within ADMIN_BATCH_SECONDS are batched into one digest message.
+
         Args:
             bot: Bot instance
             user_telegram_id: User's telegram ID
@@ -75,28 +191,32 @@ class NotificationService:
             amount: Payment amount
             order_id: Order ID
         """
-        try:
-            text = (
-                "💰 <b>Новая покупка!</b>\n\n"
-                f"👤 Пользователь: @{username or 'Unknown'} ({user_telegram_id})\n"
-                f"📦 Пакет: {package_name}\n"
-                f"💎 Изображений: {images_count}\n"
-                f"💰 Сумма: {amount:.2f}₽\n"
-                f"📝 Заказ: #{order_id}"
-            )
-
-            # Send to all admins
-            for admin_id in settings.admin_ids_list:
-                try:
-                    await bot.send_message(admin_id, text, parse_mode="HTML")
-                except Exception as e:
-                    logger.error(f"Failed to notify admin {admin_id}: {str(e)}")
+        global _admin_flush_task
 
-            logger.info(f"Payment notification sent to admins for order {order_id}")
+        try:
+            _pending_admin_payments.append({
+                "username": html.escape(username or 'Unknown'),
+                "user_telegram_id": user_telegram_id,
+                "package_name": html.escape(package_name),
+                "images_count": images_count,
+                "amount": amount,
+                "order_id": order_id
+            })
+
+            if len(_pending_admin_payments) >= ADMIN_BATCH_MAX_ORDERS:
+                await _flush_admin_payments(bot)
+            elif _admin_flush_task is None:
+                _admin_flush_task = asyncio.create_task(_flush_admin_payments_later(bot))
 
         except Exception as e:
             logger.error(f"Failed to send payment notification to admins: {str(e)}")
 
+    @staticmethod
+    async def flush_admin_payments():
+        """Wait for the pending admin payment digest to be sent (used on shutdown)"""
+        while _admin_flush_task is not None:
+            await _admin_flush_task
+
     @staticmethod
     async def notify_user_payment_failed(
         bot: Bot,
@@ -114,18 +234,12 @@ class NotificationService:
             error_message: Optional error message
         """
         try:
-            text = (
-                "❌ <b>Оплата не прошла</b>\n\n"
-                f"📦 Пакет: {package_name}\n\n"
-            )
+            text = _PAYMENT_FAILED_HEADER_TEMPLATE.format(package_name=html.escape(package_name))
 
             if error_message:
-                text += f"Причина: {error_message}\n\n"
+                text += _PAYMENT_FAILED_REASON_TEMPLATE.format(error_message=html.escape(error_message))
 
-            text += (
-                "Попробуйте еще раз или обратитесь в поддержку, "
-                "если проблема повторяется."
-            )
+            text += _PAYMENT_FAILED_FOOTER
 
             await bot.send_message(telegram_id, text, parse_mode="HTML")
             logger.info(f"Payment failed notification sent to user {telegram_id}")
@@ -152,12 +266,11 @@ class NotificationService:
             images_total: Total images in package
         """
         try:
-            text = (
-                "💵 <b>Возврат оформлен</b>\n\n"
-                f"💰 Сумма возврата: {amount:.2f}₽\n"
-                f"📸 Использовано изображений: {images_used}/{images_total}\n\n"
-                "Средства будут возвращены на вашу карту в течение 3-5 рабочих дней."
-            )
+            text = _REFUND_TEMPLATE.format_map({
+                "amount": amount,
+                "images_used": images_used,
+                "images_total": images_total
+            })
 
             await bot.send_message(telegram_id, text, parse_mode="HTML")
             logger.info(f"Refund notification sent to user {telegram_id}")
@@ -186,21 +299,18 @@ class NotificationService:
         try:
             # Truncate message if too long
             display_message = message[:200] + "..." if len(message) > 200 else message
+            display_message = html.escape(display_message)
 
             text = (
                 "💬 <b>Новое обращение в поддержку!</b>\n\n"
                 f"🆔 Тикет: #{ticket_id}\n"
-                f"👤 Пользователь: @{username or 'Unknown'} (ID: {user_telegram_id})\n\n"
+                f"👤 Пользователь: @{html.escape(username or 'Unknown')} (ID: {user_telegram_id})\n\n"
                 f"📝 Сообщение:\n{display_message}\n\n"
                 f"Используйте /support_reply {ticket_id} для ответа"
             )
 
             # Send to all admins
-            for admin_id in settings.admin_ids_list:
-                try:
-                    await bot.send_message(admin_id, text, parse_mode="HTML")
-                except Exception as e:
-                    logger.error(f"Failed to notify admin {admin_id}: {str(e)}")
+            await _send_to_admins(bot, text)
 
             logger.info(f"Support request notification sent to admins for ticket {ticket_id}")
 
@@ -229,7 +339,8 @@ class NotificationService:
             text = (
                 "💬 <b>Ответ от поддержки</b>\n\n"
                 f"🆔 Тикет: #{ticket_id}\n"
-                f"👨‍💼 Администратор: @{admin_username or 'Support'}\n\n"
+                f"👨‍💼 Администратор: @{html.escape(admin_username or 'Support')}\n\n"
+                # Admin-written reply: HTML markup is passed through intentionally
                 f"📝 Ответ:\n{message}\n\n"
                 "Если у вас остались вопросы, отправьте новое сообщение через меню поддержки."
             )
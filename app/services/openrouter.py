@@ -1,15 +1,116 @@
 import aiohttp
-import base64
+import asyncio
+import binascii
+import hashlib
 import logging
+import math
+import orjson
+import ssl
 from io import BytesIO
-from typing import Optional, Dict
-from PIL import Image
+from typing import Optional, Dict, Tuple
+from PIL import Image, ImageOps
 import numpy as np
 
 from app.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Stands in for the image data URL while the request payload is serialized
+_IMAGE_URL_PLACEHOLDER = "__image_data_url__"
+
+# Scales a per-channel RGB tolerance to a Euclidean distance
+_SQRT3 = math.sqrt(3)
+
+# Upper bound on border pixels fed to background color clustering
+_BORDER_SAMPLE_MAX = 4000
+
+# Image formats accepted from the API response (checked by magic bytes, not PIL)
+_RESPONSE_IMAGE_MIMES = ("image/png", "image/jpeg", "image/webp")
+
+
+def _shorten_for_log(value, max_chars: int = 200):
+    """
+    Copy of an API response structure with long strings (base64 images) truncated for logging
+
+    Args:
+        value: Parsed JSON value (dict, list, str, ...)
+        max_chars: Maximum length of strings kept as is
+
+    Returns:
+        Same structure with strings longer than max_chars cut down
+    """
+    if isinstance(value, str) and len(value) > max_chars:
+        return f"{value[:max_chars]}... ({len(value)} chars)"
+    if isinstance(value, dict):
+        return {key: _shorten_for_log(item, max_chars) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_shorten_for_log(item, max_chars) for item in value]
+    return value
+
+
+def _sniff_mime(buf: bytes, default: Optional[str] = "image/jpeg") -> Optional[str]:
+    """
+    Detect image MIME type from magic bytes (no PIL decoding needed)
+
+    Args:
+        buf: Image bytes (only the first 12 bytes are inspected)
+        default: Value returned for unknown formats
+
+    Returns:
+        MIME type string, or default for unknown formats
+    """
+    if buf[:8] == b'\x89PNG\r\n\x1a\n':
+        return "image/png"
+    if buf[:3] == b'\xff\xd8\xff':
+        return "image/jpeg"
+    if buf[:4] == b'RIFF' and buf[8:12] == b'WEBP':
+        return "image/webp"
+    if buf[:6] in (b'GIF87a', b'GIF89a'):
+        return "image/gif"
+    return default
+
+
+def _downscale_for_upload(image_bytes: bytes, max_size: int) -> Tuple[bytes, str]:
+    """
+    Downscale and recompress image before sending it to the API
+
+    The model output resolution is ~1MP, so larger inputs only cost upload
+    time and image tokens. Images that already fit are returned unchanged;
+    larger ones are rotated per their EXIF orientation (which the re-encode
+    would otherwise drop), then re-encoded as JPEG if the source was JPEG and
+    as lossless PNG otherwise (PNG/WEBP/GIF/... sources, transparency).
+
+    Args:
+        image_bytes: Original image bytes
+        max_size: Maximum dimension size
+
+    Returns:
+        Tuple of (image bytes, MIME type); original bytes if processing fails
+    """
+    try:
+        image = Image.open(BytesIO(image_bytes))
+        if max(image.size) <= max_size:
+            return image_bytes, _sniff_mime(image_bytes)
+
+        source_format = image.format
+
+        # Apply EXIF orientation before the pixels are re-encoded without EXIF
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_size, max_size), Image.LANCZOS)
+
+        output = BytesIO()
+        # Only already-lossy JPEG sources are re-encoded lossily
+        if source_format == 'JPEG':
+            image.convert('RGB').save(output, format='JPEG', quality=90, optimize=True)
+            return output.getvalue(), "image/jpeg"
+
+        image.save(output, format='PNG')
+        return output.getvalue(), "image/png"
+
+    except Exception as e:
+        logger.error(f"Error downscaling image for upload: {str(e)}")
+        return image_bytes, _sniff_mime(image_bytes)
+
 
 def detect_dominant_background_color(image_bytes: bytes, requested_color: tuple = None, border_thickness: int = 10, tolerance: int = 30) -> tuple:
     """
@@ -17,15 +118,15 @@ def detect_dominant_background_color(image_bytes: bytes, requested_color: tuple
 
     This improved algorithm:
     1. Samples pixels from all image borders (not just corners)
-    2. Groups similar colors together using tolerance-based clustering
-    3. Finds the dominant color cluster
-    4. Returns the average color of the dominant cluster
+    2. Groups similar colors by quantizing RGB into bins of size `tolerance` (vectorized histogram)
+    3. Finds the dominant color bin
+    4. Returns the average color of the pixels in the dominant bin
 
     Args:
         image_bytes: Image bytes
         requested_color: The color we requested from AI (for validation)
         border_thickness: Thickness of border region to sample (in pixels)
-        tolerance: Color similarity tolerance for clustering (0-255)
+        tolerance: Color similarity tolerance for clustering (0-255), used as histogram bin size
 
     Returns:
         RGB tuple of the detected dominant background color
@@ -35,96 +136,111 @@ def detect_dominant_background_color(image_bytes: bytes, requested_color: tuple
         if img.mode != 'RGB' and img.mode != 'RGBA':
             img = img.convert('RGB')
 
-        width, height = img.size
-        data = np.array(img)
+        # Read-only view of the pixels, no need for a writable copy
+        data = np.asarray(img)
+    except Exception as e:
+        logger.error(f"Error detecting dominant color: {str(e)}", exc_info=True)
+        return requested_color if requested_color else (0, 255, 0)
+
+    return _detect_background_color_in_pixels(data, requested_color, border_thickness, tolerance)
+
+
+def _detect_background_color_in_pixels(data: np.ndarray, requested_color: tuple = None, border_thickness: int = 10, tolerance: int = 30) -> tuple:
+    """
+    Detect dominant background color from already decoded pixels
+
+    Same as detect_dominant_background_color(), for callers that have the image decoded anyway.
+
+    Args:
+        data: HxWx3 or HxWx4 uint8 pixel array
+        requested_color: The color we requested from AI (for validation)
+        border_thickness: Thickness of border region to sample (in pixels)
+        tolerance: Color similarity tolerance for clustering (0-255), used as histogram bin size
+
+    Returns:
+        RGB tuple of the detected dominant background color
+    """
+    try:
+        height, width = data.shape[:2]
 
-        # Sample border pixels (all edges)
+        # Sample border pixels (all edges) into one preallocated array
         border_thickness = min(border_thickness, width // 10, height // 10)
-        border_pixels = []
+        side_height = max(0, height - 2 * border_thickness)
+        n_edge = border_thickness * width
+        n_side = side_height * border_thickness
+        all_border_pixels = np.empty((2 * n_edge + 2 * n_side, 3), dtype=np.uint8)
 
         # Top border
-        border_pixels.append(data[:border_thickness, :, :3].reshape(-1, 3))
+        all_border_pixels[:n_edge].reshape(border_thickness, width, 3)[...] = data[:border_thickness, :, :3]
         # Bottom border
-        border_pixels.append(data[-border_thickness:, :, :3].reshape(-1, 3))
+        all_border_pixels[n_edge:2 * n_edge].reshape(border_thickness, width, 3)[...] = data[height - border_thickness:, :, :3]
         # Left border (excluding corners to avoid duplication)
-        border_pixels.append(data[border_thickness:-border_thickness, :border_thickness, :3].reshape(-1, 3))
+        offset = 2 * n_edge
+        all_border_pixels[offset:offset + n_side].reshape(side_height, border_thickness, 3)[...] = \
+            data[border_thickness:height - border_thickness, :border_thickness, :3]
         # Right border (excluding corners to avoid duplication)
-        border_pixels.append(data[border_thickness:-border_thickness, -border_thickness:, :3].reshape(-1, 3))
-
-        # Combine all border pixels
-        all_border_pixels = np.concatenate(border_pixels)
+        offset += n_side
+        all_border_pixels[offset:].reshape(side_height, border_thickness, 3)[...] = \
+            data[border_thickness:height - border_thickness, width - border_thickness:, :3]
 
         logger.info(f"Sampled {len(all_border_pixels)} border pixels from {border_thickness}px border")
 
-        # Cluster similar colors together using tolerance-based approach
-        # This groups colors like RGB(0,0,255), RGB(1,1,253), RGB(2,0,254) together
-        color_clusters = {}
-
-        for pixel in all_border_pixels:
-            pixel_tuple = tuple(pixel)
+        if len(all_border_pixels) == 0:
+            logger.warning("Image is too small to sample borders, using requested color")
+            return requested_color if requested_color else (0, 255, 0)
 
-            # Check if this pixel belongs to an existing cluster
-            found_cluster = False
-            for cluster_center, cluster_pixels in color_clusters.items():
-                # Calculate color distance
-                distance = np.linalg.norm(np.array(pixel_tuple) - np.array(cluster_center))
+        # A few thousand evenly spaced samples give the same dominant bin as the full border
+        if len(all_border_pixels) > _BORDER_SAMPLE_MAX:
+            # Ceiling division so the step never lets more than _BORDER_SAMPLE_MAX through
+            all_border_pixels = all_border_pixels[::-(-len(all_border_pixels) // _BORDER_SAMPLE_MAX)]
 
-                if distance <= tolerance:
-                    # Add to existing cluster
-                    cluster_pixels.append(pixel_tuple)
-                    found_cluster = True
-                    break
+        # Cluster similar colors: quantize each channel to bins of size `tolerance`
+        # and pack the three bin indices into one integer key per pixel
+        bins = (all_border_pixels // max(1, tolerance)).astype(np.uint32)
+        keys = (bins[:, 0] << 16) | (bins[:, 1] << 8) | bins[:, 2]
+        _, labels, cluster_sizes = np.unique(keys, return_inverse=True, return_counts=True)
+        labels = labels.reshape(-1)
 
-            if not found_cluster:
-                # Create new cluster
-                color_clusters[pixel_tuple] = [pixel_tuple]
+        # Average color of every bin at once
+        cluster_centers = np.stack(
+            [np.bincount(labels, weights=all_border_pixels[:, channel]) for channel in range(3)],
+            axis=1
+        ) / cluster_sizes[:, None]
 
-        logger.info(f"Found {len(color_clusters)} color clusters with tolerance={tolerance}")
+        logger.info(f"Found {len(cluster_sizes)} color clusters with tolerance={tolerance}")
 
         # Find the largest cluster (most pixels)
-        dominant_cluster_center = None
-        dominant_cluster_size = 0
-        dominant_cluster_pixels = []
-
-        for cluster_center, cluster_pixels in color_clusters.items():
-            cluster_size = len(cluster_pixels)
-            if cluster_size > dominant_cluster_size:
-                dominant_cluster_size = cluster_size
-                dominant_cluster_center = cluster_center
-                dominant_cluster_pixels = cluster_pixels
-
-        if not dominant_cluster_pixels:
-            logger.warning("No color clusters found, using requested color")
-            return requested_color if requested_color else (0, 255, 0)
+        dominant_index = int(np.argmax(cluster_sizes))
+        dominant_cluster_size = int(cluster_sizes[dominant_index])
 
-        # Calculate average color of the dominant cluster (more accurate than using first pixel)
-        cluster_array = np.array(dominant_cluster_pixels)
-        avg_color = tuple(np.round(np.mean(cluster_array, axis=0)).astype(int))
+        # Average color of the dominant cluster (more accurate than using the bin itself)
+        avg_color = tuple(int(c) for c in np.round(cluster_centers[dominant_index]))
 
         cluster_percentage = (dominant_cluster_size / len(all_border_pixels)) * 100
 
         logger.info(f"Dominant cluster: {dominant_cluster_size} pixels ({cluster_percentage:.1f}% of border)")
-        logger.info(f"Cluster center: {dominant_cluster_center}, Average color: {avg_color}")
+        logger.info(f"Average color: {avg_color}")
 
         # If we have a requested color, validate that dominant color is close to it
         if requested_color:
-            distance = np.linalg.norm(np.array(avg_color) - np.array(requested_color))
+            # Distances from every cluster center to the requested color at once
+            distances = np.linalg.norm(cluster_centers - np.array(requested_color, dtype=np.float32), axis=1)
+            distance = distances[dominant_index]
 
             if distance > 150:
                 logger.warning(f"Detected color {avg_color} is far from requested {requested_color} (distance: {distance:.1f})")
 
-                # Try to find a cluster closer to requested color
-                sorted_clusters = sorted(color_clusters.items(), key=lambda x: len(x[1]), reverse=True)
-
-                for cluster_center, cluster_pixels in sorted_clusters[:5]:  # Check top 5 clusters
-                    cluster_avg = tuple(np.round(np.mean(np.array(cluster_pixels), axis=0)).astype(int))
-                    dist = np.linalg.norm(np.array(cluster_avg) - np.array(requested_color))
-
-                    # Require at least 5% of border pixels
-                    if dist < 150 and len(cluster_pixels) > len(all_border_pixels) * 0.05:
-                        avg_color = cluster_avg
-                        logger.info(f"Using alternative cluster: {cluster_avg} (distance: {dist:.1f}, size: {len(cluster_pixels)})")
-                        break
+                # Try to find a cluster closer to requested color among the top 5 clusters
+                top_clusters = np.argsort(cluster_sizes)[::-1][:5]
+                # Require at least 5% of border pixels; candidates stay ordered by size
+                candidates = top_clusters[
+                    (distances[top_clusters] < 150) &
+                    (cluster_sizes[top_clusters] > len(all_border_pixels) * 0.05)
+                ]
+                if len(candidates):
+                    index = candidates[0]
+                    avg_color = tuple(int(c) for c in np.round(cluster_centers[index]))
+                    logger.info(f"Using alternative cluster: {avg_color} (distance: {distances[index]:.1f}, size: {cluster_sizes[index]})")
 
         return avg_color
 
@@ -153,12 +269,20 @@ def remove_colored_background(image_bytes: bytes, target_color: tuple = (0, 255,
         Image bytes with transparent background
     """
     try:
+        # Open image and convert to RGBA (decoded once, shared with color detection)
+        img = Image.open(BytesIO(image_bytes))
+        if img.mode != 'RGBA':
+            img = img.convert('RGBA')
+
+        # Read-only uint8 view of the pixels; only the alpha channel is copied and modified
+        data = np.asarray(img)
+
         # Auto-detect the actual background color if requested
         if auto_detect:
             # Use tolerance for detection as well
             detection_tolerance = min(30, tolerance // 2)
-            detected_color = detect_dominant_background_color(
-                image_bytes,
+            detected_color = _detect_background_color_in_pixels(
+                data,
                 requested_color=target_color,
                 tolerance=detection_tolerance
             )
@@ -167,31 +291,28 @@ def remove_colored_background(image_bytes: bytes, target_color: tuple = (0, 255,
         else:
             actual_target = target_color
 
-        # Open image and convert to RGBA
-        img = Image.open(BytesIO(image_bytes))
-        if img.mode != 'RGBA':
-            img = img.convert('RGBA')
-
-        # Convert to numpy array for efficient processing
-        data = np.array(img).astype(np.float32)
-
-        # Define target color
-        target = np.array(actual_target, dtype=np.float32)
-
-        # Calculate Euclidean distance from target color for each pixel
-        # This better handles color variations than checking each channel separately
-        color_distances = np.linalg.norm(data[:, :, :3] - target, axis=2)
+        # Calculate squared Euclidean distance from target color for each pixel
+        # This better handles color variations than checking each channel separately.
+        # Squared integer distances give the same mask without a per-pixel sqrt.
+        # Each channel only has 256 possible values, so its squared difference is
+        # looked up in a small table instead of subtracting and squaring every pixel.
+        channel_values = np.arange(256, dtype=np.int32)
+        color_distances_sq = np.take((channel_values - int(actual_target[0])) ** 2, data[:, :, 0])
+        for channel in (1, 2):
+            color_distances_sq += np.take((channel_values - int(actual_target[channel])) ** 2, data[:, :, channel])
 
         # Create mask based on distance threshold
         # Convert tolerance (per-channel) to Euclidean distance
         # For RGB, max distance when all channels differ by tolerance is: sqrt(3 * tolerance^2)
-        distance_threshold = np.sqrt(3) * tolerance
+        distance_threshold = _SQRT3 * tolerance
+        distance_threshold_sq = 3 * tolerance * tolerance
 
         # Full transparency for pixels within tolerance
-        is_background = color_distances <= distance_threshold
+        is_background = color_distances_sq <= distance_threshold_sq
 
         # Set alpha to 0 for background pixels
-        data[is_background, 3] = 0
+        alpha = data[:, :, 3].copy()
+        alpha[is_background] = 0
 
         # Optional: Edge feathering for smoother transitions
         if edge_feather:
@@ -199,41 +320,48 @@ def remove_colored_background(image_bytes: bytes, target_color: tuple = (0, 255,
             feather_range = tolerance * 0.5
             feather_distance_threshold = distance_threshold + feather_range
 
-            is_feather_zone = (color_distances > distance_threshold) & (color_distances <= feather_distance_threshold)
+            # Built in place from the existing background mask to avoid extra full-image temporaries
+            is_feather_zone = color_distances_sq <= feather_distance_threshold ** 2
+            is_feather_zone &= ~is_background
 
             # Calculate alpha based on distance (linear falloff)
-            # Pixels at distance_threshold get alpha=255, at feather_distance_threshold get alpha=255
+            # Pixels at distance_threshold get alpha=0, at feather_distance_threshold get alpha=255
             # This creates a smooth transition
             if np.any(is_feather_zone):
-                feather_pixels_distances = color_distances[is_feather_zone]
+                # sqrt only for the (small) feather zone
+                feather_pixels_distances = np.sqrt(color_distances_sq[is_feather_zone])
                 # Normalize to 0-1 range
                 normalized_distances = (feather_pixels_distances - distance_threshold) / feather_range
                 # Calculate alpha (0 at threshold, 255 at feather edge)
                 feather_alpha = (normalized_distances * 255).astype(np.uint8)
 
                 # Apply feathered alpha, but don't make pixels MORE opaque
-                current_alpha = data[is_feather_zone, 3].astype(np.uint8)
-                data[is_feather_zone, 3] = np.minimum(current_alpha, feather_alpha)
+                alpha[is_feather_zone] = np.minimum(alpha[is_feather_zone], feather_alpha)
 
-                logger.info(f"Applied edge feathering to {np.sum(is_feather_zone)} pixels")
+                logger.info(f"Applied edge feathering to {feather_alpha.size} pixels")
 
-        # Convert back to uint8
-        data = data.astype(np.uint8)
+        # Nothing became transparent: a PNG input is already the result, skip the re-encode
+        if _sniff_mime(image_bytes, default=None) == "image/png" and np.array_equal(alpha, data[:, :, 3]):
+            logger.info(f"No pixels matched background color {actual_target}, returning original PNG")
+            return image_bytes
 
-        # Convert back to PIL Image
-        result = Image.fromarray(data, 'RGBA')
+        # Put the new alpha channel back (RGB channels are never copied through NumPy)
+        result = img
+        result.putalpha(Image.fromarray(alpha, 'L'))
 
-        # Save to bytes
+        # Save to bytes (fast zlib level by default: the result goes straight to Telegram,
+        # encode time matters more than size)
         output = BytesIO()
-        result.save(output, format='PNG')
-        output.seek(0)
+        result.save(output, format='PNG', compress_level=settings.RESULT_PNG_COMPRESS_LEVEL)
 
-        transparent_pixels = np.sum(is_background)
-        total_pixels = data.shape[0] * data.shape[1]
-        transparency_percent = (transparent_pixels / total_pixels) * 100
+        # Statistics need another pass over the mask, only worth it when they are logged
+        if logger.isEnabledFor(logging.INFO):
+            transparent_pixels = np.count_nonzero(is_background)
+            total_pixels = data.shape[0] * data.shape[1]
+            transparency_percent = (transparent_pixels / total_pixels) * 100
 
-        logger.info(f"Chroma key removal completed for color {actual_target} with tolerance={tolerance}")
-        logger.info(f"Removed {transparent_pixels:,} pixels ({transparency_percent:.1f}% of image)")
+            logger.info(f"Chroma key removal completed for color {actual_target} with tolerance={tolerance}")
+            logger.info(f"Removed {transparent_pixels:,} pixels ({transparency_percent:.1f}% of image)")
 
         return output.getvalue()
 
@@ -262,17 +390,82 @@ def remove_green_screen(image_bytes: bytes, tolerance: int = 50) -> bytes:
 class OpenRouterService:
     """Service for interacting with OpenRouter API for image editing"""
 
+    # Inputs above this size are downscaled before upload
+    UPLOAD_MAX_SIZE = 1024
+    UPLOAD_RESIZE_MIN_BYTES = 512 * 1024
+
+    # Timeouts are built once and shared by all calls
+    _REQUEST_TIMEOUT = aiohttp.ClientTimeout(total=60, sock_connect=10, sock_read=55)
+    _PING_TIMEOUT = aiohttp.ClientTimeout(total=30)
+
     def __init__(self):
         self.api_key = settings.OPENROUTER_API_KEY
         # Use Gemini 2.5 Flash Image for image editing capabilities
         # You can override this in settings with OPENROUTER_MODEL
         self.model = settings.OPENROUTER_MODEL or "google/gemini-2.5-flash-image-preview"
         self.base_url = "https://openrouter.ai/api/v1/chat/completions"
+        # Free endpoint used for health checks (no model inference)
+        self.auth_key_url = "https://openrouter.ai/api/v1/auth/key"
+        # Static request headers, built once. Not set as session defaults so the
+        # API key is never sent along with image downloads from third-party URLs
+        self._headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+            "HTTP-Referer": "https://bg-removal-bot.com",  # Optional: your site
+            "X-Title": "BG Removal Bot"  # Optional: your app name
+        }
+        # Long-lived HTTP session, created lazily inside the running event loop
+        self._session: Optional[aiohttp.ClientSession] = None
+        # (image hash, prompt, background_color) -> future of the request currently being processed
+        self._inflight: Dict[tuple, asyncio.Future] = {}
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Get shared HTTP session (keeps TLS connections to OpenRouter alive between requests)"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                timeout=self._REQUEST_TIMEOUT,
+                connector=aiohttp.TCPConnector(
+                    # One SSL context lets OpenSSL reuse TLS session tickets across connections
+                    ssl=ssl.create_default_context(),
+                    limit=200,
+                    limit_per_host=64,
+                    ttl_dns_cache=300,
+                    keepalive_timeout=75,
+                    enable_cleanup_closed=True
+                )
+            )
+        return self._session
+
+    async def close(self):
+        """Close shared HTTP session"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def _prepare_upload(self, image_bytes: bytes) -> Tuple[bytes, str]:
+        """
+        Get image bytes and MIME type to upload, downscaling large images in a worker thread
+
+        Args:
+            image_bytes: Original image bytes
+
+        Returns:
+            Tuple of (image bytes, MIME type)
+        """
+        if len(image_bytes) < self.UPLOAD_RESIZE_MIN_BYTES:
+            return image_bytes, _sniff_mime(image_bytes)
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, _downscale_for_upload, image_bytes, self.UPLOAD_MAX_SIZE)
 
     async def remove_background(self, image_bytes: bytes, prompt: str, background_color: tuple = None) -> Dict:
         """
         Remove background from image using OpenRouter API with image editing model
 
+        Concurrent identical requests (same image, prompt and background color)
+        share a single API call. Completed results are not cached: generation is
+        not deterministic, so re-sending the same image must produce a new result.
+
         Args:
             image_bytes: Image bytes
             prompt: Prompt for background removal (должен быть специфичным)
@@ -283,23 +476,44 @@ class OpenRouterService:
         Returns:
             dict with keys: success (bool), image_bytes (bytes), error (str)
         """
+        key = (hashlib.blake2b(image_bytes, digest_size=16).digest(), prompt, background_color)
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            logger.info("Waiting for identical in-flight request")
+            # shield: a cancelled waiter must not cancel the shared future
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        result = {
+            "success": False,
+            "image_bytes": None,
+            "error": "Request was cancelled"
+        }
+
         try:
-            # Convert image to base64
-            base64_image = base64.b64encode(image_bytes).decode('utf-8')
+            result = await self._request_remove_background(image_bytes, prompt, background_color)
+        finally:
+            del self._inflight[key]
+            future.set_result(result)
 
-            # Detect image format
-            image = Image.open(BytesIO(image_bytes))
-            image_format = image.format.lower() if image.format else 'jpeg'
-            mime_type = f"image/{image_format}"
+        return result
 
-            # Prepare request with modalities for image generation
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json",
-                "HTTP-Referer": "https://bg-removal-bot.com",  # Optional: your site
-                "X-Title": "BG Removal Bot"  # Optional: your app name
-            }
+    async def _request_remove_background(self, image_bytes: bytes, prompt: str, background_color: tuple = None) -> Dict:
+        """
+        Call OpenRouter API to remove background (no caching)
+
+        Arguments and return value are the same as for remove_background().
+        """
+        # Evaluated once so large structures are never formatted when DEBUG is off
+        debug_enabled = logger.isEnabledFor(logging.DEBUG)
 
+        try:
+            # Downscale large images and detect format
+            upload_bytes, mime_type = await self._prepare_upload(image_bytes)
+
+            # Prepare request with modalities for image generation
             payload = {
                 "model": self.model,
                 "modalities": ["text", "image"],  # Enable image output
@@ -315,7 +529,7 @@ class OpenRouterService:
                             {
                                 "type": "image_url",
                                 "image_url": {
-                                    "url": f"data:{mime_type};base64,{base64_image}"
+                                    "url": _IMAGE_URL_PLACEHOLDER
                                 }
                             }
                         ]
@@ -325,159 +539,120 @@ class OpenRouterService:
                 "max_tokens": 4096  # Increased for image generation (1290 image tokens needed)
             }
 
+            # Serialize the small payload with orjson, then splice the base64 bytes straight
+            # into the body: the multi-MB data URL never becomes a str or gets JSON-escaped
+            head, tail = orjson.dumps(payload).split(b'"' + _IMAGE_URL_PLACEHOLDER.encode('ascii') + b'"', 1)
+            body = b"".join((
+                head,
+                f'"data:{mime_type};base64,'.encode('ascii'),
+                binascii.b2a_base64(upload_bytes, newline=False),
+                b'"',
+                tail
+            ))
+            del payload, upload_bytes, head, tail
+
             logger.info(f"Sending request to OpenRouter API with model: {self.model}")
 
-            async with aiohttp.ClientSession() as session:
-                async with session.post(self.base_url, json=payload, headers=headers, timeout=aiohttp.ClientTimeout(total=60)) as response:
-                    if response.status == 200:
-                        result = await response.json()
-                        logger.info(f"OpenRouter API response received successfully")
-                        logger.info(f"Response keys: {result.keys()}")
-                        # logger.info(f"Full API response: {result}")
-
-                        # Extract image from response
-                        # The response contains images in the message content
-                        try:
-                            choices = result.get('choices', [])
-                            if not choices:
-                                logger.error("No choices in API response")
+            session = await self._get_session()
+            async with session.post(self.base_url, data=body, headers=self._headers, timeout=self._REQUEST_TIMEOUT) as response:
+                if response.status == 200:
+                    # Parse raw bytes with orjson (faster and fewer copies than aiohttp's text + json.loads)
+                    result = orjson.loads(await response.read())
+                    logger.info(f"OpenRouter API response received successfully")
+                    logger.info(f"Response keys: {result.keys()}")
+                    # logger.info(f"Full API response: {result}")
+
+                    # Extract image from response
+                    # The response contains images in the message content
+                    try:
+                        choices = result.get('choices', [])
+                        if not choices:
+                            logger.error("No choices in API response")
+                            if debug_enabled:
                                 logger.debug(f"Response keys: {result.keys()}")
-                                raise ValueError("No choices in API response")
-
-                            message = choices[0].get('message', {})
-                            logger.debug(f"Message content: {message}")
-
-                            # Check for images field (new format for image generation)
-                            images = message.get('images', [])
-                            logger.debug(f"Images field: {images}, type: {type(images)}")
-
-                            if images:
-                                # Images are returned as base64 data URLs or URLs
-                                image_data = images[0]
-                                logger.debug(f"Image data type: {type(image_data)}, first 100 chars: {str(image_data)[:100]}")
-
-                                # Handle dict format (some APIs return {url: "...", type: "...", image_url: {...}})
-                                if isinstance(image_data, dict):
-                                    # Try different possible keys for the image URL
-                                    image_url = (image_data.get('url') or
-                                                image_data.get('data') or
-                                                image_data.get('image_url'))
-
-                                    # If image_url is also a dict, extract the url from it
-                                    if isinstance(image_url, dict):
-                                        logger.debug(f"image_url is dict: {image_url.keys()}")
-                                        image_url = image_url.get('url') or image_url.get('data')
-
-                                    if image_url:
-                                        image_data = image_url
-                                        logger.debug(f"Extracted URL from dict: {str(image_url)[:100]}")
-                                    else:
-                                        logger.error(f"Dict format image data without url/data/image_url field: {image_data.keys()}")
-                                        logger.error(f"Full dict content: {image_data}")
-                                        raise ValueError(f"Unexpected dict format: {image_data.keys()}")
-
-                                # Handle data URL format: data:image/png;base64,xxxx
-                                if isinstance(image_data, str):
-                                    if image_data.startswith('data:'):
-                                        # Extract base64 part
-                                        base64_part = image_data.split(',', 1)[1] if ',' in image_data else image_data
-                                        processed_image_bytes = base64.b64decode(base64_part)
-                                        logger.debug(f"Decoded base64 image, size: {len(processed_image_bytes)} bytes")
-                                    elif image_data.startswith('http'):
-                                        # It's a URL - need to download
-                                        logger.debug(f"Downloading image from URL: {image_data}")
-                                        async with session.get(image_data) as img_response:
-                                            if img_response.status == 200:
-                                                processed_image_bytes = await img_response.read()
-                                                logger.debug(f"Downloaded image, size: {len(processed_image_bytes)} bytes")
-                                            else:
-                                                raise ValueError(f"Failed to download image from URL: {img_response.status}")
-                                    else:
-                                        # Assume it's raw base64 without prefix
-                                        logger.debug("Attempting to decode as raw base64")
-                                        processed_image_bytes = base64.b64decode(image_data)
-                                        logger.debug(f"Decoded raw base64, size: {len(processed_image_bytes)} bytes")
-                                else:
-                                    logger.error(f"Unexpected image data type: {type(image_data)}, value: {image_data}")
-                                    raise ValueError(f"Unexpected image data type: {type(image_data)}")
-
-                                # Validate it's a valid image
-                                Image.open(BytesIO(processed_image_bytes))
-
-                                logger.info("Successfully extracted processed image from API response")
-
-                                # AI cannot generate transparent backgrounds directly!
-                                # Always apply chroma keying when background_color is specified
-                                if background_color:
-                                    # Apply chroma key to convert colored background to transparency
-                                    logger.info(f"Applying chroma key to remove {background_color} background")
-                                    final_image_bytes = remove_colored_background(processed_image_bytes, target_color=background_color)
-                                else:
-                                    # No post-processing needed (e.g., white background for photos)
-                                    final_image_bytes = processed_image_bytes
-
-                                return {
-                                    "success": True,
-                                    "image_bytes": final_image_bytes,
-                                    "error": None
-                                }
-                            else:
-                                # Fallback: check content field for base64 images
-                                content = message.get('content', '')
-                                if 'base64' in content or content.startswith('data:'):
-                                    # Try to extract base64 from content
-                                    if content.startswith('data:'):
-                                        base64_part = content.split(',', 1)[1] if ',' in content else content
-                                    else:
-                                        base64_part = content
-
-                                    processed_image_bytes = base64.b64decode(base64_part)
-                                    Image.open(BytesIO(processed_image_bytes))  # Validate
-
-                                    # AI cannot generate transparent backgrounds - always use chroma keying
-                                    if background_color:
-                                        logger.info(f"Applying chroma key to remove {background_color} background (fallback path)")
-                                        final_image_bytes = remove_colored_background(processed_image_bytes, target_color=background_color)
-                                    else:
-                                        final_image_bytes = processed_image_bytes
-
-                                    return {
-                                        "success": True,
-                                        "image_bytes": final_image_bytes,
-                                        "error": None
-                                    }
-                                else:
-                                    raise ValueError("No image data found in API response")
-
-                        except Exception as extract_error:
-                            logger.error(f"Failed to extract image from response: {str(extract_error)}", exc_info=True)
-                            logger.debug(f"Full response structure: {result}")
-
-                            # Try to extract any useful info from the response for debugging
-                            if 'choices' in result and result['choices']:
-                                msg = result['choices'][0].get('message', {})
-                                logger.debug(f"Message keys: {msg.keys()}")
-                                logger.debug(f"Content type: {type(msg.get('content'))}")
-                                if 'images' in msg:
-                                    logger.debug(f"Images structure: {type(msg['images'])}, length: {len(msg['images']) if isinstance(msg['images'], (list, tuple)) else 'N/A'}")
-                                    if msg['images']:
-                                        logger.debug(f"First image type: {type(msg['images'][0])}")
-
-                            return {
-                                "success": False,
-                                "image_bytes": None,
-                                "error": f"Failed to extract image: {str(extract_error)}"
-                            }
+                            raise ValueError("No choices in API response")
+
+                        message = choices[0].get('message', {})
+                        if debug_enabled:
+                            logger.debug(f"Message content: {_shorten_for_log(message)}")
+
+                        # Check for images field (new format for image generation)
+                        images = message.get('images', [])
+                        if debug_enabled:
+                            logger.debug(f"Images field: {_shorten_for_log(images)}, type: {type(images)}")
+
+                        if images:
+                            # Images are returned as base64 data URLs or URLs
+                            image_field = images[0]
+                            if debug_enabled:
+                                logger.debug(f"Image data type: {type(image_field)}, first 100 chars: {str(image_field)[:100]}")
+                        else:
+                            # Fallback: check content field for base64 images
+                            content = message.get('content') or ''
+                            if 'base64' not in content and not content.startswith('data:'):
+                                raise ValueError("No image data found in API response")
+                            image_field = content
+
+                        processed_image_bytes = await self._decode_image_field(image_field, session)
+                        if debug_enabled:
+                            logger.debug(f"Decoded image, size: {len(processed_image_bytes)} bytes")
+
+                        # Validate it's a valid image (magic bytes are enough, no PIL decode)
+                        if _sniff_mime(processed_image_bytes, default=None) not in _RESPONSE_IMAGE_MIMES:
+                            raise ValueError("API response does not contain a recognized image")
+
+                        logger.info("Successfully extracted processed image from API response")
+
+                        # AI cannot generate transparent backgrounds directly!
+                        # Always apply chroma keying when background_color is specified
+                        if background_color:
+                            # Apply chroma key to convert colored background to transparency
+                            # (in a worker thread: decode, NumPy masking and PNG encode would block the event loop)
+                            logger.info(f"Applying chroma key to remove {background_color} background")
+                            loop = asyncio.get_running_loop()
+                            final_image_bytes = await loop.run_in_executor(
+                                None, remove_colored_background, processed_image_bytes, background_color
+                            )
+                        else:
+                            # No post-processing needed (e.g., white background for photos)
+                            final_image_bytes = processed_image_bytes
+
+                        return {
+                            "success": True,
+                            "image_bytes": final_image_bytes,
+                            "error": None
+                        }
+
+                    except Exception as extract_error:
+                        logger.error(f"Failed to extract image from response: {str(extract_error)}", exc_info=True)
+                        if debug_enabled:
+                            logger.debug(f"Full response structure: {_shorten_for_log(result)}")
+
+                        # Try to extract any useful info from the response for debugging
+                        if debug_enabled and 'choices' in result and result['choices']:
+                            msg = result['choices'][0].get('message', {})
+                            logger.debug(f"Message keys: {msg.keys()}")
+                            logger.debug(f"Content type: {type(msg.get('content'))}")
+                            if 'images' in msg:
+                                logger.debug(f"Images structure: {type(msg['images'])}, length: {len(msg['images']) if isinstance(msg['images'], (list, tuple)) else 'N/A'}")
+                                if msg['images']:
+                                    logger.debug(f"First image type: {type(msg['images'][0])}")
 
-                    else:
-                        error_text = await response.text()
-                        logger.error(f"OpenRouter API error: {response.status} - {error_text}")
                         return {
                             "success": False,
                             "image_bytes": None,
-                            "error": f"API error: {response.status} - {error_text}"
+                            "error": f"Failed to extract image: {str(extract_error)}"
                         }
 
+                else:
+                    error_text = await response.text()
+                    logger.error(f"OpenRouter API error: {response.status} - {error_text}")
+                    return {
+                        "success": False,
+                        "image_bytes": None,
+                        "error": f"API error: {response.status} - {error_text}"
+                    }
+
         except Exception as e:
             logger.error(f"Error in remove_background: {str(e)}")
             return {
@@ -486,29 +661,68 @@ class OpenRouterService:
                 "error": str(e)
             }
 
-    async def test_connection(self) -> bool:
-        """Test OpenRouter API connection"""
-        try:
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
+    async def _decode_image_field(self, image_field, session: aiohttp.ClientSession) -> bytes:
+        """
+        Decode image from an API response field
 
-            payload = {
-                "model": self.model,
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": "test"
-                    }
-                ],
-                "max_tokens": 10
-            }
+        Branches are ordered by frequency: Gemini almost always returns a
+        data:image/png;base64 URL, dict wrappers and plain URLs are rare.
 
-            async with aiohttp.ClientSession() as session:
-                async with session.post(self.base_url, json=payload, headers=headers, timeout=aiohttp.ClientTimeout(total=30)) as response:
-                    return response.status == 200
+        Args:
+            image_field: Item of message.images or message content (str or dict)
+            session: HTTP session used to download URL images
+
+        Returns:
+            Decoded image bytes
+        """
+        if isinstance(image_field, str):
+            # Handle data URL format: data:image/png;base64,xxxx
+            # binascii reads the ASCII str directly; base64.b64decode would copy it to bytes first
+            if image_field.startswith('data:'):
+                return binascii.a2b_base64(image_field[image_field.find(',') + 1:])
+
+            if image_field.startswith('http'):
+                # It's a URL - need to download
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(f"Downloading image from URL: {image_field}")
+                async with session.get(image_field) as img_response:
+                    if img_response.status != 200:
+                        raise ValueError(f"Failed to download image from URL: {img_response.status}")
+                    return await img_response.read()
+
+            # Assume it's raw base64 without prefix
+            return binascii.a2b_base64(image_field)
+
+        # Handle dict format (some APIs return {url: "...", type: "...", image_url: {...}})
+        if isinstance(image_field, dict):
+            image_url = (image_field.get('url') or
+                         image_field.get('data') or
+                         image_field.get('image_url'))
+
+            # If image_url is also a dict, extract the url from it
+            if isinstance(image_url, dict):
+                image_url = image_url.get('url') or image_url.get('data')
+
+            if not image_url:
+                logger.error(f"Dict format image data without url/data/image_url field: {image_field.keys()}")
+                raise ValueError(f"Unexpected dict format: {image_field.keys()}")
+
+            return await self._decode_image_field(image_url, session)
+
+        logger.error(f"Unexpected image data type: {type(image_field)}")
+        raise ValueError(f"Unexpected image data type: {type(image_field)}")
+
+    async def test_connection(self) -> bool:
+        """Test OpenRouter API connection and API key (free GET, no chat completion billed)"""
+        try:
+            session = await self._get_session()
+            async with session.get(self.auth_key_url, headers=self._headers, timeout=self._PING_TIMEOUT) as response:
+                return response.status == 200
 
         except Exception as e:
             logger.error(f"Connection test failed: {str(e)}")
             return False
+
+
+# Global instance (shares one HTTP session across all requests)
+openrouter_service = OpenRouterService()
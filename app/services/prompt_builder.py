@@ -1,3 +1,4 @@
+from functools import lru_cache
 from typing import Dict, Tuple
 
 
@@ -25,53 +26,92 @@ class PromptBuilder:
         if background_color is None:
             background_color = (255, 255, 255)
 
+        # Prompt only depends on a few flags, a brightness level and the color,
+        # so it is built once per combination and cached
+        brightness = image_analysis.get('brightness', 128)
+        if brightness < 100:
+            brightness_level = -1
+        elif brightness > 200:
+            brightness_level = 1
+        else:
+            brightness_level = 0
+
+        return PromptBuilder._build_prompt_cached(
+            bool(image_analysis.get('has_hair', False)),
+            bool(image_analysis.get('has_transparent_objects', False)),
+            bool(image_analysis.get('has_motion_blur', False)),
+            brightness_level,
+            tuple(background_color)
+        )
+
+    @staticmethod
+    @lru_cache(maxsize=128)
+    def _build_prompt_cached(
+        has_hair: bool,
+        has_transparent_objects: bool,
+        has_motion_blur: bool,
+        brightness_level: int,
+        background_color: Tuple[int, int, int]
+    ) -> str:
+        """
+        Build prompt for background removal (cached, see build_prompt)
+
+        Args:
+            has_hair: Subject has complex edges like hair or fur
+            has_transparent_objects: Subject has glass or reflective surfaces
+            has_motion_blur: Image has motion blur
+            brightness_level: -1 for dark, 0 for normal, 1 for bright images
+            background_color: RGB tuple for background color
+
+        Returns:
+            Optimized prompt for background removal
+        """
         r, g, b = background_color
         color_name = PromptBuilder._get_color_name(background_color)
 
         # Base instruction for background removal with specified color
-        base_prompt = (
+        parts = [
             f"Edit this image: Remove the entire background completely and replace it with a solid bright {color_name} background (RGB: {r}, {g}, {b}). "
             "Keep ONLY the main subject in the foreground. "
             f"Ensure clean, sharp edges around the subject with no {color_name} spill or halos. "
-        )
+        ]
 
         # Handle complex edges (hair, fur)
-        if image_analysis.get('has_hair', False):
-            base_prompt += (
+        if has_hair:
+            parts.append(
                 "The subject has complex edges like hair or fur - preserve every fine detail, "
                 f"maintain soft natural edges around hair strands with pixel-perfect separation from the {color_name} background. "
                 f"Avoid any {color_name} color bleeding into the hair strands. "
             )
 
         # Handle transparent objects (glass, reflections)
-        if image_analysis.get('has_transparent_objects', False):
-            base_prompt += (
+        if has_transparent_objects:
+            parts.append(
                 "Preserve any glass, transparent materials, or reflective surfaces on the subject. "
                 f"Keep their natural transparency and reflections intact, but ensure the background behind them is solid {color_name}. "
             )
 
         # Handle motion blur
-        if image_analysis.get('has_motion_blur', False):
-            base_prompt += (
+        if has_motion_blur:
+            parts.append(
                 "The image has motion blur - preserve the natural blur effect on the subject's edges "
                 f"while maintaining clean separation from the {color_name} background. "
             )
 
         # Handle brightness and contrast
-        brightness = image_analysis.get('brightness', 128)
-        if brightness < 100:
-            base_prompt += (
+        if brightness_level < 0:
+            parts.append(
                 "The image is dark - carefully separate the subject from the background, "
                 f"enhance edge detection in low light, ensure the {color_name} background is uniformly bright (RGB: {r}, {g}, {b}). "
             )
-        elif brightness > 200:
-            base_prompt += (
+        elif brightness_level > 0:
+            parts.append(
                 "The image is bright - preserve bright highlights on the subject, "
                 f"maintain consistent {color_name} background color throughout (RGB: {r}, {g}, {b}). "
             )
 
         # Add critical requirements for colored screen output
-        base_prompt += (
+        parts.append(
             "Requirements: "
             f"1) Background must be solid bright {color_name} (RGB: {r}, {g}, {b}) with no gradients or variations. "
             f"2) Subject edges must be pixel-perfect with clean separation and no {color_name} color cast. "
@@ -81,7 +121,7 @@ class PromptBuilder:
             f"6) The {color_name} background should be uniform across the entire background area."
         )
 
-        return base_prompt
+        return "".join(parts)
 
     @staticmethod
     def build_transparent_prompt(image_analysis: Dict) -> str:
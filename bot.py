@@ -3,13 +3,14 @@
 Entry point for running the bot.
 This file allows running the bot with: python bot.py or python3 bot.py
 """
-from app.bot import main
+from app.bot import main, install_uvloop
 import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
 
 if __name__ == "__main__":
+    install_uvloop()
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
@@ -21,7 +21,6 @@ from PIL import Image
 import logging
 import numpy as np
 import matplotlib.pyplot as plt
-from collections import Counter
 
 # Import the chroma key function from openrouter service
 from app.services.openrouter import remove_colored_background, detect_dominant_background_color
@@ -114,17 +113,22 @@ def plot_color_histogram(image_path: str, output_path: str, title: str = "Color
         rgb_data = data[:, :, :3][non_transparent_mask]
 
         if len(rgb_data) > 0:
-            # Convert RGB pixels to tuples for counting
-            pixels_as_tuples = [tuple(pixel) for pixel in rgb_data]
-            color_counts = Counter(pixels_as_tuples)
+            # Pack RGB pixels into one uint32 key each and count them in NumPy
+            # (no per-pixel Python tuples)
+            rgb_data = rgb_data.astype(np.uint32)
+            packed = (rgb_data[:, 0] << 16) | (rgb_data[:, 1] << 8) | rgb_data[:, 2]
+            unique_colors, color_counts = np.unique(packed, return_counts=True)
 
             # Get top 10 most common colors
-            top_colors = color_counts.most_common(10)
+            top_indices = np.argsort(color_counts, kind='stable')[::-1][:10]
 
             # Create bar chart
-            y_pos = np.arange(len(top_colors))
-            counts = [count for _, count in top_colors]
-            color_rgbs = [color for color, _ in top_colors]
+            y_pos = np.arange(len(top_indices))
+            counts = [int(color_counts[i]) for i in top_indices]
+            color_rgbs = [
+                (int(unique_colors[i] >> 16) & 0xFF, int(unique_colors[i] >> 8) & 0xFF, int(unique_colors[i]) & 0xFF)
+                for i in top_indices
+            ]
 
             # Normalize RGB values for matplotlib (0-1 range)
             bar_colors = [(r/255, g/255, b/255) for r, g, b in color_rgbs]
@@ -143,7 +147,7 @@ def plot_color_histogram(image_path: str, output_path: str, title: str = "Color
             for i, (bar, count) in enumerate(zip(bars, counts)):
                 width = bar.get_width()
                 ax3.text(width, bar.get_y() + bar.get_height()/2,
-                        f' {count:,} ({count/len(pixels_as_tuples)*100:.1f}%)',
+                        f' {count:,} ({count/len(rgb_data)*100:.1f}%)',
                         ha='left', va='center', fontsize=8)
         else:
             ax3.text(0.5, 0.5, 'No non-transparent pixels',
@@ -173,7 +177,7 @@ def plot_color_histogram(image_path: str, output_path: str, title: str = "Color
 
         if len(rgb_data) > 0:
             stats.append("")
-            stats.append(f"Unique colors (non-transparent): {len(color_counts):,}")
+            stats.append(f"Unique colors (non-transparent): {len(unique_colors):,}")
 
         stats_text = '\n'.join(stats)
         ax4.text(0.1, 0.95, stats_text, transform=ax4.transAxes,